@@ -1,14 +1,34 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from typing import Optional
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from supabase import create_client
+from supabase import acreate_client, AsyncClient
 
 load_dotenv()
 
-supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
-app = FastAPI()
+SUPABASE_URL = os.getenv('SUPABASE_URL')
+SUPABASE_KEY = os.getenv('SUPABASE_KEY')
+supabase: Optional[AsyncClient] = None
+
+# Cap in-flight PostgREST requests so API load stays under the project's db pool
+SUPABASE_MAX_CONCURRENCY = int(os.getenv('SUPABASE_MAX_CONCURRENCY') or 10)
+supabase_slots: Optional[asyncio.Semaphore] = None
+
+# Columns returned by GET /reminders, matching what POST /reminders accepts
+REMINDER_COLUMNS = 'id,user_id,fcm_token,reminder_time,expires_on'
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The async client and semaphore have to be created inside the running event loop
+    global supabase, supabase_slots
+    supabase = await acreate_client(SUPABASE_URL, SUPABASE_KEY)
+    supabase_slots = asyncio.Semaphore(SUPABASE_MAX_CONCURRENCY)
+    yield
+
+app = FastAPI(lifespan=lifespan)
 
 class ReminderCreate(BaseModel):
     user_id: str
@@ -19,22 +39,25 @@ class ReminderCreate(BaseModel):
 @app.post("/reminders")
 async def create_reminder(reminder: ReminderCreate):
     try:
-        response = supabase.table('reminder').insert({
-            "user_id": reminder.user_id,
-            "fcm_token": reminder.fcm_token,
-            "reminder_time": reminder.reminder_time,
-            "expires_on": reminder.expires_on
-        }).execute()
+        async with supabase_slots:
+            response = await supabase.table('reminder').insert({
+                "user_id": reminder.user_id,
+                "fcm_token": reminder.fcm_token,
+                "reminder_time": reminder.reminder_time,
+                "expires_on": reminder.expires_on
+            }).execute()
         return response.data[0]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/reminders/{user_id}")
 async def get_reminders(user_id: str):
-    response = supabase.table('reminder').select('*').eq('user_id', user_id).execute()
+    async with supabase_slots:
+        response = await supabase.table('reminder').select(REMINDER_COLUMNS).eq('user_id', user_id).execute()
     return response.data
 
 @app.delete("/reminders/{reminder_id}")
 async def delete_reminder(reminder_id: str):
-    supabase.table('reminder').delete().eq('id', reminder_id).execute()
+    async with supabase_slots:
+        await supabase.table('reminder').delete().eq('id', reminder_id).execute()
     return {"message": "Deleted"}
\ No newline at end of file
@@ -1,31 +1,134 @@
 import os
 import json
-from datetime import datetime, time, timedelta
-import pytz
+import asyncio
+import logging
+import tempfile
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
 from supabase import create_client, Client
 import firebase_admin
 from firebase_admin import credentials, messaging
+from google.auth._helpers import REFRESH_THRESHOLD
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Per-reminder detail is logged at DEBUG with lazy %s arguments, so at the default
+# INFO level the send loop neither formats those messages nor writes them
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(), format='%(message)s')
+log = logging.getLogger(__name__)
+
 # --- Configuration ---
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 # Changed to read the content string instead of the path
 FIREBASE_CREDENTIALS_CONTENT = os.getenv('FIREBASE_CREDENTIALS') 
 TIMEZONE = 'Africa/Lagos'  # Nigeria timezone
+NIGERIA_TZ = ZoneInfo(TIMEZONE)
+# When set, keep one process alive and run the check every N seconds instead of once
+RUN_INTERVAL_SECONDS = int(os.getenv('REMINDER_INTERVAL_SECONDS') or 0)
+WINDOW_MINUTES = 20  # Send reminders due within the next X minutes
+# Only the columns main() reads when building notifications. The base ones are
+# written by the API; the medication details are used when the table has them.
+REMINDER_COLUMNS = 'id,user_id,fcm_token,reminder_time,last_notified_date'
+OPTIONAL_REMINDER_COLUMNS = 'name,dose,medicine_id,schedule_id'
+UNDEFINED_COLUMN = '42703'  # Postgres error code for a missing column
+# Rows claimed per RPC call. claim_due_reminders marks up to this many rows before PostgREST
+# applies the project's max-rows to the result, so this MUST NOT exceed max-rows: any extra
+# rows would be marked notified without ever being returned, sent or released.
+REMINDER_PAGE_SIZE = int(os.getenv('REMINDER_PAGE_SIZE') or 200)
+UPDATE_BATCH_SIZE = 200  # ids per in_() filter, keeping the request URL short
+FCM_BATCH_SIZE = 500  # send_each accepts at most 500 messages per call
+FCM_MAX_CONCURRENT_BATCHES = 2  # send_each_async calls in flight at once, across all pages
+FCM_WARMUP_TOPIC = '__warmup__'  # only ever used with dry_run, so nothing is delivered
+# Opt-in file for keeping the Firebase access token between one-shot runs, so a self-hosted
+# cron on the same machine can skip the OAuth refresh. Leave unset on GitHub Actions: every
+# run gets a fresh VM, and a bearer token shouldn't be stored in the Actions cache.
+FCM_TOKEN_CACHE = os.getenv('FCM_TOKEN_CACHE')
+if FCM_TOKEN_CACHE:
+    FCM_TOKEN_CACHE = os.path.abspath(os.path.expanduser(FCM_TOKEN_CACHE))
+# google-auth refreshes tokens within REFRESH_THRESHOLD of expiry anyway, so only reuse ones
+# with a minute to spare beyond that
+FCM_TOKEN_MIN_TTL = REFRESH_THRESHOLD + timedelta(seconds=60)
+FCM_TOKEN_MAX_TTL = timedelta(hours=1)  # Google access tokens never last longer than this
 
 # --- Initialize Supabase ---
 try:
     supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    print("✅ Supabase client initialized.")
+    log.info("✅ Supabase client initialized.")
 except Exception as e:
-    print(f"❌ Error initializing Supabase: {e}")
+    log.error(f"❌ Error initializing Supabase: {e}")
     supabase = None # Set to None if initialization fails
 
 # --- Initialize Firebase ---
+
+def is_private_to_user(st: os.stat_result):
+    """Check a file or directory is owned by this user and closed to everyone else"""
+    if not hasattr(os, 'getuid'):
+        return True  # No POSIX ownership on Windows; the path is under the user's profile
+    return st.st_uid == os.getuid() and not st.st_mode & 0o077
+
+def load_cached_access_token():
+    """Reuse a still-valid Firebase access token saved by a previous run"""
+    try:
+        # Don't follow a symlink planted in place of the cache file
+        fd = os.open(FCM_TOKEN_CACHE, os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0))
+        with os.fdopen(fd) as f:
+            if not is_private_to_user(os.fstat(f.fileno())):
+                log.warning(f"⚠️  Ignoring {FCM_TOKEN_CACHE}: not private to this user.")
+                return
+            cached = json.load(f)
+        
+        google_cred = firebase_admin.get_app().credential.get_credential()
+        if cached.get('client_email') != google_cred.service_account_email:
+            return
+        
+        # google-auth keeps expiry as a naive UTC datetime
+        expiry = datetime.fromisoformat(cached['expiry'])
+        remaining = expiry - datetime.now(timezone.utc).replace(tzinfo=None)
+        if FCM_TOKEN_MIN_TTL < remaining <= FCM_TOKEN_MAX_TTL:
+            google_cred.token = cached['token']
+            google_cred.expiry = expiry
+            log.info("✅ Reusing cached Firebase access token.")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        log.warning(f"⚠️  Could not load cached Firebase access token: {e}")
+
+def save_access_token():
+    """Save the current Firebase access token for the next run"""
+    try:
+        google_cred = firebase_admin.get_app().credential.get_credential()
+        if not google_cred.token or not google_cred.expiry:
+            return
+        
+        cached = {
+            'client_email': google_cred.service_account_email,
+            'token': google_cred.token,
+            'expiry': google_cred.expiry.isoformat(),
+        }
+        
+        # The token is a bearer credential, so keep it in a directory only this user can open
+        cache_dir = os.path.dirname(FCM_TOKEN_CACHE)
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        if not is_private_to_user(os.lstat(cache_dir)):
+            log.warning(f"⚠️  Not saving Firebase access token: {cache_dir} is not private to this user.")
+            return
+        
+        # mkstemp creates a new 0600 file, and os.replace swaps it in without following links
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.fcm_token.')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(cached, f)
+            os.replace(tmp_path, FCM_TOKEN_CACHE)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except Exception as e:
+        log.warning(f"⚠️  Could not save Firebase access token: {e}")
+
 try:
     if FIREBASE_CREDENTIALS_CONTENT:
         # Load the service account info from the JSON content string
@@ -34,160 +137,218 @@ try:
         # Initialize credentials using the dictionary content
         cred = credentials.Certificate(service_account_info)
         firebase_admin.initialize_app(cred)
-        print("✅ Firebase initialized from content.")
+        log.info("✅ Firebase initialized from content.")
+        if FCM_TOKEN_CACHE:
+            load_cached_access_token()
     else:
-        print("❌ ERROR: FIREBASE_CREDENTIALS environment variable is empty.")
+        log.error("❌ ERROR: FIREBASE_CREDENTIALS environment variable is empty.")
 except json.JSONDecodeError:
-    print("❌ ERROR: FIREBASE_CREDENTIALS content is not valid JSON.")
+    log.error("❌ ERROR: FIREBASE_CREDENTIALS content is not valid JSON.")
 except Exception as e:
-    print(f"❌ ERROR initializing Firebase: {e}")
+    log.error(f"❌ ERROR initializing Firebase: {e}")
 
 
 # --- Utility Functions ---
 
 def get_current_nigeria_time():
     """Get current time in Nigeria timezone"""
-    tz = pytz.timezone(TIMEZONE)
-    return datetime.now(tz)
+    return datetime.now(NIGERIA_TZ)
 
 def time_to_string(t: datetime):
     """Convert time object to HH:MM:SS string"""
     return t.strftime('%H:%M:%S')
 
-def is_within_window(reminder_time_str: str, current_time: datetime, window_minutes=20):
-    """Check if reminder time is within the next X minutes from now"""
-    # Parse reminder time
-    reminder_hour, reminder_minute = map(int, reminder_time_str.split(':')[:2])
-    reminder_time = time(reminder_hour, reminder_minute)
-    
-    # Get current time as time object
-    current_time_only = current_time.time()
-    
-    # Calculate the end of the window (20 minutes from now)
-    current_datetime = datetime.combine(current_time.date(), current_time_only)
-    window_end = (current_datetime + timedelta(minutes=window_minutes)).time()
-    
-    # Return True if reminder is between now and 20 minutes from now
-    if current_time_only <= reminder_time <= window_end:
-        return True
-    return False
+def minute_of_day(t: datetime):
+    """Convert a datetime to minutes since midnight"""
+    return t.hour * 60 + t.minute
+
+def parse_minute_of_day(time_str: str):
+    """Convert an HH:MM or HH:MM:SS string to minutes since midnight"""
+    hour, minute = time_str[:5].split(':')
+    return int(hour) * 60 + int(minute)
 
 # --- Supabase Functions ---
 
-def get_reminders_to_send():
-    """Query Supabase for reminders that need to be sent"""
+# Falls back to REMINDER_COLUMNS for the rest of the process if the optional ones are missing
+reminder_columns = f'{REMINDER_COLUMNS},{OPTIONAL_REMINDER_COLUMNS}'
+
+def claim_reminders_to_send(today: datetime):
+    """Claim reminders that need to be sent as of `today`.
+
+    The claim_due_reminders SQL function (see supabase/migrations) selects
+    due reminders and sets their last_notified_date in one statement, so
+    overlapping runs never get the same row. Yields pages of at most
+    REMINDER_PAGE_SIZE rows, so the caller can start sending before the next
+    page is claimed. Each row's last_notified_date is the value from before
+    the claim; anything not sent must be passed to release_reminders with it.
+    Reminders without an fcm_token are never claimed.
+    """
     if not supabase:
-        print("❌ Supabase client not available.")
-        return []
-        
-    try:
-        today = get_current_nigeria_time()
-        # Use the time part of the localized datetime object
-        now = today.time()
-        
-        # Calculate one hour later time for the query range
-        now_datetime = datetime.combine(today.date(), now)
-        one_hour_later_datetime = now_datetime + timedelta(hours=1)
-        
-        now_str = now.strftime("%H:%M:%S")
-        one_hour_str = one_hour_later_datetime.strftime("%H:%M:%S")
-        
+        log.error("❌ Supabase client not available.")
+        return
         
-        # Query reminders
-        response = supabase.table('reminder').select('*').or_(
-            f'last_notified_date.is.null,last_notified_date.lt.{today.date().isoformat()}'
-        ).or_(
-            f'expires_on.is.null,expires_on.gt.{today.date().isoformat()}'
-        ).filter("reminder_time", "gte", now_str).filter("reminder_time", "lte", one_hour_str).execute()
+    # Calculate the end of the send window for the query range
+    window_end = today + timedelta(minutes=WINDOW_MINUTES)
+    
+    # main() compares whole minutes, so cover every second of both end minutes
+    params = {
+        'p_date': today.date().isoformat(),
+        'p_start': today.strftime("%H:%M:00"),
+        'p_end': window_end.strftime("%H:%M:59"),
+        'p_limit': REMINDER_PAGE_SIZE,
+    }
+    
+    # Claimed rows stop matching, so each call returns the next page
+    global reminder_columns
+    while True:
+        try:
+            response = supabase.rpc('claim_due_reminders', params).select(reminder_columns).execute()
+        except Exception as e:
+            # An unknown column fails before the function runs, so nothing was claimed
+            if reminder_columns != REMINDER_COLUMNS and getattr(e, 'code', None) == UNDEFINED_COLUMN:
+                log.warning(f"⚠️  Reminder table lacks medication columns, claiming without them: {e}")
+                reminder_columns = REMINDER_COLUMNS
+                continue
+            log.error(f"❌ Error querying Supabase: {e}")
+            return
         
-        return response.data
-    except Exception as e:
-        print(f"❌ Error querying Supabase: {e}")
-        return []
+        if response.data:
+            yield response.data
+        if len(response.data) < REMINDER_PAGE_SIZE:
+            return
+
+def release_reminders(previous_dates):
+    """Restore last_notified_date on claimed reminders that were not sent.
 
-def update_reminder(reminder_id):
-    """Update reminder's last_notified_date"""
+    `previous_dates` maps reminder id to its last_notified_date from before
+    the claim. Ids sharing a date are updated together, UPDATE_BATCH_SIZE per request.
+    """
     if not supabase:
-        print("❌ Supabase client not available.")
+        log.error("❌ Supabase client not available.")
         return False
 
+    ids_by_date = {}
+    for reminder_id, previous_date in previous_dates.items():
+        ids_by_date.setdefault(previous_date, []).append(reminder_id)
+
     try:
-        # Corrected table name to 'reminder' for consistency
-        today = get_current_nigeria_time().date().isoformat()
-        supabase.table('reminder').update({
-            'last_notified_date': today
-        }).eq('id', reminder_id).execute()
-        print(f"✅ Updated reminder {reminder_id}")
+        for previous_date, reminder_ids in ids_by_date.items():
+            for start in range(0, len(reminder_ids), UPDATE_BATCH_SIZE):
+                supabase.table('reminder').update({
+                    'last_notified_date': previous_date
+                }).in_('id', reminder_ids[start:start + UPDATE_BATCH_SIZE]).execute()
+        log.info(f"✅ Released {len(previous_dates)} unsent reminders")
         return True
     except Exception as e:
-        print(f"❌ Error updating reminder: {e}")
+        log.error(f"❌ Error releasing reminders {list(previous_dates)}: {e}")
         return False
 
-# --- Firebase Functions ---
+def warm_up_supabase():
+    """Issue one small query so the connection is open before the first check"""
+    if not supabase:
+        return
 
-def send_fcm_notification(fcm_token, title, body, medicine_id=None, schedule_id=None):
-    """Send FCM notification using Firebase Admin SDK with medicine_id in data"""
-    if not firebase_admin._apps:
-        print("❌ Firebase app not initialized.")
-        return False
-        
     try:
-        # Build the data payload
-        data_payload = {
-            "notification_type": "medication_reminder",
-        }
-        
-        # Add medicine_id if provided
-        if medicine_id:
-            data_payload["medicine_id"] = str(medicine_id)
-        
-        # Add schedule_id if provided
-        if schedule_id:
-            data_payload["schedule_id"] = str(schedule_id)
-        
-        message = messaging.Message(
-            notification=messaging.Notification(
-                title=title,
-                body=body,
-            ),
-            data=data_payload,  # Add the data payload here
-            token=fcm_token,
-        )
-        
-        response = messaging.send(message)
-        print(f"✅ Notification sent successfully: {response}")
-        print(f"   📦 Data payload: {data_payload}")
-        return True
+        supabase.table('reminder').select('id').limit(1).execute()
+        log.info("✅ Supabase connection warmed up.")
     except Exception as e:
-        print(f"❌ Error sending notification: {e}")
-        return False
+        log.warning(f"⚠️  Supabase warmup failed: {e}")
 
-# --- Main Execution ---
+# --- Firebase Functions ---
 
-def main():
-    """Main function to check and send reminders"""
-    if not supabase or not firebase_admin._apps:
-        print("\n🛑 Skipping execution due to service initialization failure.")
-        return
+def build_fcm_notification(fcm_token, title, body, medicine_id=None, schedule_id=None):
+    """Build an FCM message with medicine_id in data"""
+    # Build the data payload
+    data_payload = {
+        "notification_type": "medication_reminder",
+    }
+    
+    # Add medicine_id if provided
+    if medicine_id:
+        data_payload["medicine_id"] = str(medicine_id)
+    
+    # Add schedule_id if provided
+    if schedule_id:
+        data_payload["schedule_id"] = str(schedule_id)
+    
+    return messaging.Message(
+        notification=messaging.Notification(
+            title=title,
+            body=body,
+        ),
+        data=data_payload,  # Add the data payload here
+        token=fcm_token,
+    )
+
+async def send_fcm_notifications(messages, batch_slots: asyncio.Semaphore):
+    """Send FCM messages with send_each_async, chunked to FCM_BATCH_SIZE.
 
-    print("\n" + "="*60)
-    print(f"🕐 Running reminder check at {get_current_nigeria_time().strftime('%Y-%m-%d %H:%M:%S %Z')}")
-    print("="*60)
+    Chunks are sent concurrently on the event loop, but only as many at once
+    as `batch_slots` allows, so the caller can bound in-flight requests across
+    several calls. Returns a list of booleans, one per message, in the same order.
+    """
+    if not firebase_admin._apps:
+        log.error("❌ Firebase app not initialized.")
+        return [False] * len(messages)
     
-    # Get current time
-    current_time = get_current_nigeria_time()
+    async def send_batch(batch):
+        async with batch_slots:
+            return await messaging.send_each_async(batch)
     
-    # Get all active reminders
-    reminders = get_reminders_to_send()
-    print(f"\n📋 Found {len(reminders)} active reminders to check")
+    batches = [messages[start:start + FCM_BATCH_SIZE] for start in range(0, len(messages), FCM_BATCH_SIZE)]
+    responses = await asyncio.gather(
+        *(send_batch(batch) for batch in batches),
+        return_exceptions=True,
+    )
     
-    if not reminders:
-        print("ℹ️  No reminders found")
+    results = []
+    for batch, response in zip(batches, responses):
+        if isinstance(response, Exception):
+            log.error(f"❌ Error sending notification batch: {response}")
+            results.extend([False] * len(batch))
+            continue
+        
+        for send_response in response.responses:
+            if not send_response.success:
+                log.warning("❌ Error sending notification: %s", send_response.exception)
+            results.append(send_response.success)
+        log.info(f"✅ Batch sent: {response.success_count} succeeded, {response.failure_count} failed")
+    return results
+
+async def warm_up_fcm():
+    """Validate a dummy message so the FCM connection and access token are ready.
+
+    dry_run makes FCM validate without delivering, but it still goes through
+    the same async client that send_fcm_notifications uses.
+    """
+    if not firebase_admin._apps:
         return
     
-    # Check each reminder
-    send_count = 0
-    skip_count = 0
+    try:
+        response = await messaging.send_each_async([messaging.Message(topic=FCM_WARMUP_TOPIC)], dry_run=True)
+    except Exception as e:
+        log.warning(f"⚠️  FCM warmup failed: {e}")
+        return
+    
+    # send_each_async reports per-message failures instead of raising
+    if response.failure_count:
+        log.warning(f"⚠️  FCM warmup failed: {response.responses[0].exception}")
+    else:
+        log.info("✅ FCM connection warmed up.")
+
+# --- Main Execution ---
+
+def queue_notifications(reminders, current_minute, current_time_str, queued):
+    """Build notifications for reminders within the send window.
+
+    Returns a list of (reminder_ids, message) pairs and the skipped ids.
+    Reminders that would produce the same push to the same token in the same
+    minute share one message: `queued` maps that key to the ids list of the
+    message already built, and is shared across pages.
+    """
+    window_end_minute = current_minute + WINDOW_MINUTES
+    to_send = []
+    skipped_ids = []
     
     for reminder in reminders:
         reminder_id = reminder['id']
@@ -201,48 +362,169 @@ def main():
         
         # Skip if no token is available
         if not fcm_token:
-            print(f"   ❌ Skipping reminder {reminder_id}: No FCM token available.")
-            skip_count += 1
+            log.debug("   ❌ Skipping reminder %s: No FCM token available.", reminder_id)
+            skipped_ids.append(reminder_id)
             continue
 
-        print(f"\n👤 Checking reminder for user: {user_id}")
-        print(f"   Reminder time: {reminder_time}")
-        print(f"   Current time: {current_time.strftime('%H:%M:%S')}")
-        print(f"   Medicine ID: {medicine_id}")
+        log.debug(
+            "\n👤 Checking reminder for user: %s\n"
+            "   Reminder time: %s\n"
+            "   Current time: %s\n"
+            "   Medicine ID: %s",
+            user_id, reminder_time, current_time_str, medicine_id,
+        )
         
-        # Check if within time window
-        if is_within_window(reminder_time, current_time):
-            print(f"   ✅ Within time window - SENDING")
+        # Check if within time window (the query already filters this, so this is a safety net)
+        if current_minute <= reminder['_minute'] <= window_end_minute:
+            # Send duplicates once, but report every reminder id with the result
+            key = (fcm_token, reminder['_minute'], medication_name, dose, medicine_id, schedule_id)
+            if key in queued:
+                log.debug("   🔁 Duplicate of a queued notification - MERGED")
+                queued[key].append(reminder_id)
+                continue
+            
+            log.debug("   ✅ Within time window - QUEUED")
+            queued[key] = [reminder_id]
             
             # Create persuasive notification text
             notification_body = f"Time to take {medication_name} - {dose}"
             
-            # Send notification with medicine_id
-            success = send_fcm_notification(
+            # Stage notification with medicine_id for the batch send
+            to_send.append((queued[key], build_fcm_notification(
                 fcm_token=fcm_token,
                 title="💊 Medication Reminder",
                 body=notification_body,
                 medicine_id=medicine_id,  # Pass medicine_id here
                 schedule_id=schedule_id   # Pass schedule_id if available
-            )
-            
-            if success:
-                # Update database
-                update_reminder(reminder_id)
-                send_count += 1
-            else:
-                print(f"   ❌ Failed to send notification")
+            )))
         else:
-            print(f"   ⏭️  Not within time window - SKIPPING")
-            skip_count += 1
+            log.debug("   ⏭️  Not within time window - SKIPPING")
+            skipped_ids.append(reminder_id)
+    
+    return to_send, skipped_ids
+
+async def main():
+    """Main function to check and send reminders"""
+    if not supabase or not firebase_admin._apps:
+        log.error("\n🛑 Skipping execution due to service initialization failure.")
+        return
+
+    # Get current time once for the whole check
+    current_time = get_current_nigeria_time()
+    current_time_str = time_to_string(current_time)
+    current_minute = minute_of_day(current_time)
+
+    log.info(
+        "\n" + "="*60 + "\n"
+        f"🕐 Running reminder check at {current_time.strftime('%Y-%m-%d %H:%M:%S %Z')}\n"
+        + "="*60
+    )
+    
+    total_count = 0
+    send_count = 0
+    skip_count = 0
+    fail_count = 0
+    batches = []  # (to_send, send task) per page
+    queued = {}  # dedup key -> reminder ids sharing one notification
+    unsent = {}  # claimed and not yet sent: id -> previous last_notified_date, released however main() exits
+    today_str = current_time.date().isoformat()
+    # Created here so it belongs to the running event loop (required on Python 3.9)
+    batch_slots = asyncio.Semaphore(FCM_MAX_CONCURRENT_BATCHES)
+    
+    try:
+        # Queue each page's notifications while the next page is claimed in a thread
+        pages = claim_reminders_to_send(current_time)
+        page = await asyncio.to_thread(next, pages, None)
+        while page is not None:
+            for reminder in page:
+                # A claimed row was never notified today, so today here means an older
+                # claim_due_reminders that returns the new value; fall back to clearing it
+                previous_date = reminder.get('last_notified_date')
+                unsent[reminder['id']] = None if previous_date == today_str else previous_date
+            total_count += len(page)
+            
+            # Parse each reminder time once so the loop only compares integers
+            for reminder in page:
+                reminder['_minute'] = parse_minute_of_day(reminder['reminder_time'])
+            
+            to_send, skipped_ids = queue_notifications(page, current_minute, current_time_str, queued)
+            skip_count += len(skipped_ids)
+            if to_send:
+                log.info(f"\n📤 Sending {len(to_send)} notifications")
+                batches.append((to_send, asyncio.create_task(
+                    send_fcm_notifications([message for _, message in to_send], batch_slots)
+                )))
+            
+            page = await asyncio.to_thread(next, pages, None)
+        
+        log.info(f"\n📋 Found {total_count} active reminders to check")
+        if not total_count:
+            log.info("ℹ️  No reminders found")
+            return
+        
+        for to_send, task in batches:
+            results = await task
+            for (reminder_ids, _), success in zip(to_send, results):
+                if success:
+                    for reminder_id in reminder_ids:
+                        unsent.pop(reminder_id, None)
+                    send_count += len(reminder_ids)
+                else:
+                    log.warning("   ❌ Failed to send notification for reminders %s", reminder_ids)
+                    fail_count += len(reminder_ids)
+    finally:
+        # Don't leave sends running for reminders that are about to be released
+        for _, task in batches:
+            task.cancel()
+        
+        # Sent reminders are already marked; let the rest be picked up again
+        if unsent:
+            release_reminders(unsent)
     
     # Summary
-    print("\n" + "="*60)
-    print(f"📊 Summary:")
-    print(f"   Total checked: {len(reminders)}")
-    print(f"   Sent: {send_count}")
-    print(f"   Skipped: {skip_count}")
-    print("="*60 + "\n")
+    log.info(
+        "\n" + "="*60 + "\n"
+        "📊 Summary:\n"
+        f"   Total checked: {total_count}\n"
+        f"   Sent: {send_count}\n"
+        f"   Failed: {fail_count}\n"
+        f"   Skipped: {skip_count}\n"
+        + "="*60 + "\n"
+    )
+    
+async def warm_up():
+    """Open the Supabase and FCM connections concurrently instead of on the first check"""
+    await asyncio.gather(asyncio.to_thread(warm_up_supabase), warm_up_fcm())
+
+async def run_once():
+    """Run a single reminder check, warming up FCM while the first page is claimed.
+
+    The claim itself opens the Supabase connection, so only FCM is warmed up.
+    The warmup is cancelled if the check finishes first, e.g. when nothing is due.
+    """
+    fcm_warmup = asyncio.create_task(warm_up_fcm())
+    try:
+        await main()
+    finally:
+        fcm_warmup.cancel()
+
+async def run_forever(interval_seconds):
+    """Run main() every interval_seconds, reusing the same Supabase and Firebase clients"""
+    log.info(f"🔁 Running reminder check every {interval_seconds} seconds")
+    await warm_up()
+    
+    while True:
+        started = monotonic()
+        try:
+            await main()
+        except Exception as e:
+            log.error(f"❌ Error during reminder check: {e}")
+        await asyncio.sleep(max(0, interval_seconds - (monotonic() - started)))
     
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if RUN_INTERVAL_SECONDS > 0:
+        asyncio.run(run_forever(RUN_INTERVAL_SECONDS))
+    else:
+        asyncio.run(run_once())
+        if FCM_TOKEN_CACHE and firebase_admin._apps:
+            save_access_token()
@@ -0,0 +1,3 @@
+-- Supports the reminder_time window scan in reminder.py get_reminders_to_send
+create index if not exists reminder_time_last_notified_date_idx
+    on public.reminder (reminder_time, last_notified_date);
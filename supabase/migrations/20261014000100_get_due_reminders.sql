@@ -0,0 +1,12 @@
+-- Due reminders for reminder.py get_reminders_to_send, as one planned query
+create or replace function public.get_due_reminders(p_date date, p_start time, p_end time)
+returns setof public.reminder
+language sql
+stable
+as $$
+    select *
+    from public.reminder
+    where (last_notified_date is null or last_notified_date < p_date)
+      and (expires_on is null or expires_on > p_date)
+      and reminder_time between p_start and p_end;
+$$;
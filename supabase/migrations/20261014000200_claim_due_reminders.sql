@@ -0,0 +1,26 @@
+-- Marks up to p_limit due reminders as notified on p_date and returns them,
+-- so reminder.py fetches and marks in one round-trip. Rows it fails to send
+-- are released again by resetting last_notified_date.
+create or replace function public.claim_due_reminders(p_date date, p_start time, p_end time, p_limit integer)
+returns setof public.reminder
+language sql
+volatile
+as $$
+    with due as (
+        select id
+        from public.reminder
+        where (last_notified_date is null or last_notified_date < p_date)
+          and (expires_on is null or expires_on > p_date)
+          and reminder_time between p_start and p_end
+        order by reminder_time, id
+        limit p_limit
+        for update
+    )
+    update public.reminder r
+    set last_notified_date = p_date
+    from due
+    where r.id = due.id
+    returning r.*;
+$$;
+
+drop function if exists public.get_due_reminders(date, time, time);
@@ -0,0 +1,25 @@
+-- Lets overlapping reminder.py runs claim disjoint rows instead of waiting on
+-- each other's row locks. The update re-checks last_notified_date, so a row
+-- can only be claimed once per day however many runs overlap.
+create or replace function public.claim_due_reminders(p_date date, p_start time, p_end time, p_limit integer)
+returns setof public.reminder
+language sql
+volatile
+as $$
+    with due as (
+        select id
+        from public.reminder
+        where (last_notified_date is null or last_notified_date < p_date)
+          and (expires_on is null or expires_on > p_date)
+          and reminder_time between p_start and p_end
+        order by reminder_time, id
+        limit p_limit
+        for update skip locked
+    )
+    update public.reminder r
+    set last_notified_date = p_date
+    from due
+    where r.id = due.id
+      and r.last_notified_date is distinct from p_date
+    returning r.*;
+$$;